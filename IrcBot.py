@@ -2,11 +2,12 @@
 
 from datetime import datetime
 from platform import system
-from re import compile
+from re import compile, escape
+from select import select
 from shlex import split
 from socket import socket, AF_INET, SOCK_STREAM
 from sys import exit
-from time import sleep
+from time import monotonic
 
 __author__ = 'Jai Brown aka JaINTP'
 __credits__ = ['Jai Brown', ]
@@ -14,21 +15,40 @@ __version__ = '1.0.0'
 __maintainer__ = 'Jai Brown'
 __email__ = 'j.brown.dev@gmail.com'
 
+# Splits ':nick!user@host ACTION recipient :message' into its parts.
+_IRC_PAT = compile(rb':([^!]+)!(\S+)\s+(\S+)\s+:?(\S+)'
+                   rb'\s*(?:[:+-]+(.*))?(?:[:+-]+(.*))?')
+# Names of the _IRC_PAT groups, in order.
+_KEYS = ('nick', 'user', 'action', 'recipient', 'message', 'extra')
+# Seconds to wait for NickServ to acknowledge identification.
+_IDENTIFY_TIMEOUT = 10
+# Pre-encoded prefixes for frequently sent commands.
+_JOIN = b'JOIN '
+_PONG = b'PONG '
+_PRIVMSG = b'PRIVMSG '
+# Debug timestamp with the colour codes between fields baked in.
+_DEBUG_TIME = '%H%%g:%%o%M%%g:%%o%S'
+
 
 class _ConsoleColourer(object):
-    """Basic class to handle the colouring of console output. Only
-    supports ANSI escape sequences.
+    """Basic class to handle the colouring of console output. Colour codes
+    are turned into ANSI escape sequences, except on Windows where they are
+    stripped and the output is left uncoloured.
     """
-    # TODO Add Windows support... LOL!
 
     __slots__ = [
         '__colours',
+        '__re',
+        '__strip_re',
+        '__table',
+        '_format',
     ]
 
     def __init__(self):
         """Constructor.
 
-        Initialises colour codes for formatting use.
+        Initialises colour codes for formatting use and picks the
+        formatter for the current platform.
         """
         super(_ConsoleColourer, self).__init__()
         self.__colours = {
@@ -41,9 +61,18 @@ class _ConsoleColourer(object):
             'c': 36,  # Cyan
             'G': 37,  # Grey
         }
+        self.__table = {'%' + char: '\033[{0}m'.format(code)
+                        for char, code in self.__colours.items()}
+        self.__re = compile('|'.join(map(escape, self.__table)))
+        self.__strip_re = compile('%[' + ''.join(self.__colours) + ']')
+
+        if system() == 'Windows':
+            self._format = self._format_win
+        else:
+            self._format = self._format_ansi
 
-    def _format(self, string: str) -> str:
-        """Formats a given string.
+    def _format_ansi(self, string: str) -> str:
+        """Formats a given string using ANSI escape sequences.
 
         :type string:  String
         :param string: String to be formatted and printed.
@@ -51,17 +80,26 @@ class _ConsoleColourer(object):
         :rtype:        String
         :return:       The resulting formatted string.
         """
-        base = '\033[{0}m'
+        if '%' not in string:
+            return string  # Nothing to colour, skip the regex entirely.
 
-        for char in self.__colours:
-            if system() is 'Windows':
-                string = string.replace('%' + char, '')
-            else:
-                string = string.replace('%' + char,
-                                        base.format(self.__colours[char]))
-                string = '{}\033[0m'.format(string)
+        string = self.__re.sub(lambda m: self.__table[m.group(0)], string)
+
+        return '{0}\033[0m'.format(string)
 
-        return string
+    def _format_win(self, string: str) -> str:
+        """Formats a given string by stripping its colour codes.
+
+        :type string:  String
+        :param string: String to be formatted and printed.
+
+        :rtype:        String
+        :return:       The resulting formatted string.
+        """
+        if '%' not in string:
+            return string  # Nothing to strip, skip the regex entirely.
+
+        return self.__strip_re.sub('', string)
 
     def print(self, string: str):
         """Outputs a given string in colour.
@@ -93,9 +131,10 @@ class Event(object):
 
     def __init__(self):
         """Constructor
-        Initialises member variables.
+        Initialises member variables. Handlers are kept as the keys of a
+        dict, which gives set-like lookups while preserving call order.
         """
-        self.__handlers = []
+        self.__handlers = {}
 
     def __iadd__(self, handler):
         """Adds a handler to the event.
@@ -105,8 +144,7 @@ class Event(object):
         :rtype:         Event
         :return:        The updated event object.
         """
-        if handler not in self.__handlers:
-            self.__handlers.append(handler)
+        self.__handlers.setdefault(handler)
 
         return self
 
@@ -118,11 +156,19 @@ class Event(object):
         :rtype:         Event
         :return:        The updated event object.
         """
-        if handler in self.__handlers:
-            self.__handlers.remove(handler)
+        self.__handlers.pop(handler, None)
 
         return self
 
+    def __len__(self):
+        """Returns the number of handlers linked to the event, so an event
+        without handlers is falsy.
+
+        :rtype:  Int
+        :return: The number of handlers.
+        """
+        return len(self.__handlers)
+
     def __call__(self, *args):
         """Calls all handlers linked to the event.
 
@@ -131,7 +177,9 @@ class Event(object):
         :rtype:      Event
         :return:     The updated event object.
         """
-        for handler in self.__handlers:
+        # Iterate over a snapshot so handlers may add or remove handlers,
+        # including themselves, while the event is firing.
+        for handler in tuple(self.__handlers):
             handler(*args)
 
         return self
@@ -236,14 +284,15 @@ class Config(object):
         respective variables.
         """
         with open(self.__file, 'r') as f:
-            content = [line.rstrip() for line in f.readlines()]
+            for line in f:
+                key, sep, value = line.partition(':')
 
-        for setting in content:
-            setting = [item.lstrip().rstrip() for item in setting.split(':')]
+                if not sep:
+                    continue  # Not a 'key: value' line.
 
-            attribute = '_Config__{0}'.format(setting[0])
-            if hasattr(self, attribute):
-                setattr(self, attribute, setting[1])
+                attribute = '_Config__{0}'.format(key.strip())
+                if hasattr(self, attribute):
+                    setattr(self, attribute, value.strip())
 
     def get(self, setting: str):
         """Gets a given attribute from the configuration.
@@ -260,11 +309,11 @@ class Config(object):
     def write_basic_config(self):
         """ Writes a basic example configuration file. """
         with open(self.__file, 'w') as f:
-            f.writelines(['nick: jaintp_bot',
-                          'server: irc.freenode.net',
-                          'password: lolYouWish!',
-                          'channel: #jaintp',
-                          'command_char: !'])
+            f.writelines(['nick: jaintp_bot\n',
+                          'server: irc.freenode.net\n',
+                          'password: lolYouWish!\n',
+                          'channel: #jaintp\n',
+                          'command_char: !\n'])
 
 
 class Bot(object):
@@ -272,13 +321,15 @@ class Bot(object):
 
     __slots__ = [
         # Member Variables.
+        '__cchar',
         '__config',
         '__connected',
         '__debug',
+        '__dispatch',
         '__nick',
         '__owners',
-        '__pat',
         '__plugins',
+        '__rfile',
         '__server',
         '__soc',
         # Events.
@@ -301,13 +352,14 @@ class Bot(object):
         :param debug:       Whether or not to print debug output.
         """
         self.__config = Config(config_file)
+        self.__cchar = self.__config.get('command_char')
         self.__connected = False
         self.__debug = debug
+        self.__dispatch = {}
         self.__nick = self.__config.get('nick')
-        self.__owners = ('JaINTP',)  # Hardcoded for now.
-        self.__pat = compile(':([^!]+)!(\S+)\s+(\S+)\s+:?(\S+)'
-                             '\s*(?:[:+-]+(.*))?(?:[:+-]+(.*))?')
+        self.__owners = frozenset(('JaINTP',))  # Hardcoded for now.
         self.__plugins = []  # To be implemented later...
+        self.__rfile = None
         self.__server = Server(self.__config.get('server'))
         self.__soc = socket(AF_INET, SOCK_STREAM)
         # Events.
@@ -322,21 +374,80 @@ class Bot(object):
         """ Initialises all built-in event handlers. """
         self.__irc_COMMAND += self.on_command
         self.__irc_KICK += self.on_kick
-        self.__irc_MODE += self.on_mode
-        self.__irc_COMMAND += self.on_privmsg
+        # on_mode is not hooked up until it is implemented, so MODE lines
+        # are not decoded just to call an empty handler.
+        self.__irc_PRIVMSG += self.on_privmsg
+        self.__dispatch = {
+            b'JOIN': self.__irc_JOIN,
+            b'KICK': self.__irc_KICK,
+            b'MODE': self.__irc_MODE,
+            b'NOTICE': self.__irc_NOTICE,
+            b'PRIVMSG': self.__irc_PRIVMSG,
+        }
 
     def connect(self):
         """ Connects to the IRC server, identifies and moves on. """
         self.__soc.connect(self.__server.as_tuple())
-        self.send_action('NICK', self.__nick)
-        self.send_action('USER',
-                         '{0} PyBot PyBot :JaINTP\'s Python IRC bot.'
-                         .format(self.__nick))
+        self.__rfile = self.__soc.makefile('rb', buffering=8192)
         self.debug_out('%oIdentifying%g...')
-        self.send_msg('Nickserv',
-                      'identify {0}'.format(self.__config.get('password')))
-        sleep(5)
-        self.__connected = True
+        self.send_many([
+            'NICK {0}'.format(self.__nick),
+            'USER {0} PyBot PyBot :JaINTP\'s Python IRC bot.'
+            .format(self.__nick),
+            'PRIVMSG Nickserv :identify {0}'
+            .format(self.__config.get('password')),
+        ])
+        self.__connected = self.__wait_identified()
+
+    def __wait_identified(self) -> bool:
+        """Handles server lines until NickServ acknowledges identification
+        or the identification timeout passes.
+
+        The timeout is enforced with select rather than a socket timeout,
+        since a timed out socket file discards what it had buffered. A
+        line that has started arriving is still read to its end.
+
+        :rtype:  Boolean
+        :return: False if the server closed the connection while waiting.
+        """
+        deadline = monotonic() + _IDENTIFY_TIMEOUT
+
+        while True:
+            if not self.__line_buffered():
+                remaining = deadline - monotonic()
+                if remaining <= 0 or not select([self.__soc], [], [],
+                                                remaining)[0]:
+                    self.debug_out('%oNo reply from NickServ%g, '
+                                   'moving on...')
+                    return True
+
+            raw = self.__rfile.readline()
+
+            if not raw:
+                self.debug_out('%oConnection closed by server%g.')
+                return False
+
+            data = raw.rstrip(b'\r\n')
+            self.__handle_line(data)
+
+            if data.startswith(b':NickServ!') and (b'identified' in data or
+                                                   b'accepted' in data):
+                self.debug_out('%oIdentified%g!')
+                return True
+
+    def __line_buffered(self) -> bool:
+        """Checks, without blocking, whether the socket file already holds
+        a complete line.
+
+        :rtype:  Boolean
+        :return: True if a readline call would return straight away.
+        """
+        self.__soc.setblocking(False)
+        try:
+            # peek returns what is buffered, reading once only if empty.
+            return b'\n' in self.__rfile.peek()
+        finally:
+            self.__soc.setblocking(True)
 
     def mainloop(self):
         """ Main IRC client logic. """
@@ -344,41 +455,62 @@ class Bot(object):
         self.connect()
 
         while self.__connected:
-            data = self.__soc.recv(1024).decode('utf-8')
+            raw = self.__rfile.readline()
 
-            if data.startswith('PING'):
-                self.send_action('PONG', data.split()[-1])
-                self.debug_out('%oPONG%g: %o{0}'.format(data.split()[-1]))
-            else:
-                self.handle_msg(data)
-                self.debug_out("%o{}".format(data))
+            if not raw:
+                self.debug_out('%oConnection closed by server%g.')
+                self.__connected = False
+                break
+
+            self.__handle_line(raw.rstrip(b'\r\n'))
 
-            # To be removed later...
-            if 'End of /MOTD' in data:
-                self.debug_out('%oMOTD done%g!')
-                self.join(self.__config.get('channel'))
+    def __handle_line(self, data: bytes):
+        """Handles a single line received from the IRC server.
 
-    def handle_msg(self, data: str):
+        :type  data: Bytes
+        :param data: Line received from the IRC server, without its CRLF.
+        """
+        if data.startswith(b'PING'):
+            target = data.rsplit(None, 1)[-1]
+            self.__send_pong(target)
+            self.debug_out('%oPONG%g: %o{0}', target)
+        else:
+            self.handle_msg(data)
+            self.debug_out('%o{0}', data)
+
+        # To be removed later...
+        if b'End of /MOTD' in data:
+            self.debug_out('%oMOTD done%g!')
+            self.join(self.__config.get('channel'))
+
+    def handle_msg(self, data: bytes):
         """Handles data received from the IRC server.
 
-        :type  data: String
+        Messages are matched as bytes and only decoded when their action's
+        event has at least one handler.
+
+        :type  data: Bytes
         :param data: Message received from the IRC server.
         """
-        reg = self.__pat.match(data)
+        # Server numerics and notices have no 'nick!user' in their prefix,
+        # so they can never match and the regex can be skipped.
+        if data.find(b'!', 0, data.find(b' ')) < 0:
+            return
+
+        reg = _IRC_PAT.match(data)
 
         if reg is not None:
-            g = reg.groups()
+            event = self.__dispatch.get(reg.group(3))
 
-            com = dict(zip(['nick', 'user', 'action', 'recipient', 'message'],
-                           [item.rstrip() for item in g if item is not None]))
-            com['orig'] = data
+            if event:  # Unknown actions and events without handlers.
+                com = {key: value.decode('utf-8', 'replace')
+                       for key, value in zip(_KEYS, reg.groups())
+                       if value is not None}
+                com['orig'] = data.decode('utf-8', 'replace')
 
-            try:
-                self.debug_out('%oCalling event handler for {0}'.format(
-                    com['action']))
-                getattr(self, 'irc_{0}'.format(com['action']))(com)
-            except AttributeError:
-                pass  # No event handler for the event\command.
+                self.debug_out('%oCalling event handler for {0}',
+                               com['action'])
+                event(com)
 
     def send(self, string: str):
         """Handles sending a string to the IRC server.
@@ -386,10 +518,27 @@ class Bot(object):
         :type  string: String
         :param string: The string to be sent.
         """
+        self.__send_bytes(string.encode() + b'\r\n')
+
+    def send_many(self, lines: list):
+        """Sends several strings to the IRC server in a single write.
+
+        :type  lines: List
+        :param lines: The strings to be sent, one IRC line each.
+        """
+        self.__send_bytes(b''.join(line.encode() + b'\r\n'
+                                   for line in lines))
+
+    def __send_bytes(self, data: bytes):
+        """Writes already encoded lines to the IRC server in full.
+
+        :type  data: Bytes
+        :param data: The CRLF terminated line(s) to be sent.
+        """
         try:
-            self.__soc.send('{0}\r\n'.format(string).encode())
-        except Exception as e:
-            self.debug_out(str(e))
+            self.__soc.sendall(data)
+        except OSError as e:
+            self.debug_out('{0}', e)
 
     def send_action(self, action: str, argument_string: str):
         """Sends a given action message to the IRC server.
@@ -399,7 +548,8 @@ class Bot(object):
         :type  argument_string: String
         :param argument_string: The string to be sent.
         """
-        self.send('{0} {1}'.format(action, argument_string))
+        self.__send_bytes(b'%s %s\r\n' % (action.encode(),
+                                           argument_string.encode()))
 
     def join(self, chan: str):
         """Performs a JOIN action.
@@ -407,11 +557,13 @@ class Bot(object):
         :type  chan: String
         :param chan: The channel to join.
         """
-        self.send_action('JOIN', chan)
+        self.__send_bytes(_JOIN + chan.encode() + b'\r\n')
 
     def quit(self):
         """ Performs a QUIT action. """
         self.send('QUIT')
+        if self.__rfile is not None:
+            self.__rfile.close()
         self.__soc.close()
         exit(0)
 
@@ -423,29 +575,44 @@ class Bot(object):
         :type  message: String
         :param message: The message to be sent to the recipient.
         """
-        self.send_action('PRIVMSG', '{0} :{1}'.format(recip, message))
+        self.__send_bytes(_PRIVMSG + b'%s :%s\r\n' % (recip.encode(),
+                                                       message.encode()))
+
+    def __send_pong(self, target: bytes):
+        """Answers a PING with the server's own token, still encoded.
+
+        :type  target: Bytes
+        :param target: The token taken from the PING line.
+        """
+        self.__send_bytes(_PONG + target + b'\r\n')
 
-    def debug_out(self, string: str):
+    def debug_out(self, fmt: str, *args):
         """Prints debug messages to stdout.
 
-        :type  string: String
-        :param string: String to be printed.
+        The message is only formatted when debug output is enabled, so
+        callers should pass their arguments rather than a built string.
+        Bytes arguments are decoded here, so raw server data can be passed
+        straight through.
+
+        :type  fmt:  String
+        :param fmt:  String to be printed, or a format string for args.
+        :type  args: Array
+        :param args: Arguments to format into the string.
         """
-        if self.__debug:
-            output = []
+        if not self.__debug:
+            return
 
-            if '\n' in string:
-                output = string.split('\n')
-            else:
-                output = [string, ]
+        if args:
+            string = fmt.format(*[arg.decode('utf-8', 'replace')
+                                  if isinstance(arg, bytes) else arg
+                                  for arg in args])
+        else:
+            string = fmt
+        stamp = datetime.now().strftime(_DEBUG_TIME)
 
-            for item in output:
-                if item is not '':
-                    CC.print("%o{0}%g[%bDebug%g] - {1}"
-                             .format(datetime.now()
-                                             .strftime('%H:%M:%S')
-                                             .replace(':', '%g:%o'),
-                                     item))
+        for item in string.split('\n'):
+            if item:
+                CC.print('%o{0}%g[%bDebug%g] - {1}'.format(stamp, item))
 
     # Event Handlers:
     def on_command(self, data: dict):
@@ -457,8 +624,7 @@ class Bot(object):
         :type  data: Dict
         :param data: Dictionary containing command data.
         """
-        self.debug_out('%oHandling command%g: %o{0}'
-                       .format(data['message'][0]))
+        self.debug_out('%oHandling command%g: %o{0}', data['message'][0])
 
         if data['nick'] in self.__owners:
             if data['message'][0] == 'die':
@@ -477,10 +643,27 @@ class Bot(object):
         :type  data: Dict
         :param data: Dictionary containing an IRC message.
         """
-        if data['message'][0] == self.__config.get('cchar'):
-            data['message'] = split(data['message'][1:])
-            self.debug_out('%oReceived command%g, %o{0}%g, %ofrom {1}'
-                           .format(data['message'][0], data['nick']))
+        # A bare trailing parameter leaves no 'message' group, and ':' alone
+        # leaves an empty one; neither can be a command.
+        message = data.get('message')
+
+        if message and message[0] == self.__cchar:
+            rest = message[1:]
+            # shlex is only needed to honour quotes and escapes; unbalanced
+            # ones (e.g. "it's") fall back to plain whitespace splitting.
+            if '"' in rest or "'" in rest or '\\' in rest:
+                try:
+                    data['message'] = split(rest)
+                except ValueError:
+                    data['message'] = rest.split()
+            else:
+                data['message'] = rest.split()
+
+            if not data['message']:
+                return  # A lone command character.
+
+            self.debug_out('%oReceived command%g, %o{0}%g, %ofrom {1}',
+                           data['message'][0], data['nick'])
             self.__irc_COMMAND(data)
 
     def on_kick(self, data: dict):
@@ -491,7 +674,7 @@ class Bot(object):
         """
         tmp = data['orig'].split()
 
-        if tmp[3] == self.__nick:
+        if len(tmp) > 3 and tmp[3] == self.__nick:
             self.join(tmp[2])
 
     def on_mode(self, data: dict):